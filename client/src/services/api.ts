@@ -62,6 +62,28 @@ const baseQueryWithReauth = async (args: any, api: any, extraOptions: any) => {
   }
 }
 
+// List endpoints return one page of rows at a time and set X-Has-More when more
+// rows exist. Follow the cursor until the whole list has been loaded.
+const fetchAllPages = async (
+  baseQuery: (arg: any) => any,
+  url: string,
+  nextPageParams: (rows: any[]) => string
+) => {
+  const rows: any[] = []
+  let pageUrl = url
+  for (;;) {
+    const result = await baseQuery(pageUrl)
+    if (result.error) {
+      return { error: result.error }
+    }
+    rows.push(...result.data)
+    if (result.meta?.response?.headers.get('X-Has-More') !== 'true') {
+      return { data: rows }
+    }
+    pageUrl = `${url}?${nextPageParams(rows)}`
+  }
+}
+
 export const api = createApi({
   reducerPath: 'api',
   baseQuery: baseQueryWithReauth,
@@ -126,7 +148,8 @@ export const api = createApi({
     }),
     // Page History
     getPageHistory: builder.query<any[], number | string>({
-      query: (pageId) => `/pages/${pageId}/history`,
+      queryFn: (pageId, _api, _extraOptions, baseQuery) =>
+        fetchAllPages(baseQuery, `/pages/${pageId}/history`, (rows) => `before_id=${rows[rows.length - 1].id}`),
       providesTags: (result, error, pageId) => [{ type: 'Page', id: typeof pageId === 'number' ? pageId : pageId }],
     }),
     restoreVersion: builder.mutation<any, { pageId: number | string; versionId: number }>({
@@ -138,7 +161,8 @@ export const api = createApi({
     }),
     // Collaborators
     getCollaborators: builder.query<any[], number | string>({
-      query: (pageId) => `/pages/${pageId}/collaborators`,
+      queryFn: (pageId, _api, _extraOptions, baseQuery) =>
+        fetchAllPages(baseQuery, `/pages/${pageId}/collaborators`, (rows) => `offset=${rows.length}`),
       providesTags: (result, error, pageId) => [{ type: 'Page', id: typeof pageId === 'number' ? pageId : pageId }],
     }),
     addCollaborator: builder.mutation<any, { pageId: number | string; user_id: number; access_level: 'read' | 'write' }>({
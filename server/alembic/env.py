@@ -9,7 +9,7 @@ sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from app.database import Base
 from app.core.config import settings
-from app.models import user, page, version, collaborator
+from app.models import user, page, page_like, version, collaborator, page_closure
 
 # Set UTF-8 encoding for Windows
 if sys.platform == 'win32':
@@ -0,0 +1,27 @@
+"""Add denormalized like_count to pages
+
+Revision ID: 004
+Revises: 003
+Create Date: 2024-02-01 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('pages', sa.Column('like_count', sa.Integer(), nullable=False, server_default='0'))
+    # Backfill counts for existing likes
+    op.execute("""
+        UPDATE pages SET like_count = counts.like_count
+        FROM (SELECT page_id, COUNT(*) AS like_count FROM page_likes GROUP BY page_id) AS counts
+        WHERE pages.id = counts.page_id
+    """)
+
+def downgrade():
+    op.drop_column('pages', 'like_count')
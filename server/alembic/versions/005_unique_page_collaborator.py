@@ -0,0 +1,32 @@
+"""Add unique constraint on page_collaborators(page_id, user_id)
+
+Revision ID: 005
+Revises: 004
+Create Date: 2024-02-01 12:30:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Keep only the most recent row for each (page_id, user_id) pair
+    op.execute("""
+        DELETE FROM page_collaborators pc
+        USING page_collaborators newer
+        WHERE pc.page_id = newer.page_id
+          AND pc.user_id = newer.user_id
+          AND pc.id < newer.id
+    """)
+    op.create_unique_constraint(
+        'unique_page_user_collaborator',
+        'page_collaborators',
+        ['page_id', 'user_id']
+    )
+
+def downgrade():
+    op.drop_constraint('unique_page_user_collaborator', 'page_collaborators', type_='unique')
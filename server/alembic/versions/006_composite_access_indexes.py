@@ -0,0 +1,36 @@
+"""Add composite (user_id, page_id, access_level) index on page_collaborators
+
+Revision ID: 006
+Revises: 005
+Create Date: 2024-02-01 13:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Lookups by user (collaborator checks, "pages shared with me") become index-only
+    # scans; access_level is included so write-access checks are index-only too
+    op.create_index(
+        'ix_page_collaborators_user_page_access',
+        'page_collaborators',
+        ['user_id', 'page_id', 'access_level']
+    )
+
+    # Single-column indexes are now covered by a composite index with the same leading column:
+    # page_likes(page_id) by unique_page_user_like, page_collaborators(page_id) by
+    # unique_page_user_collaborator and page_collaborators(user_id) by the index above
+    op.drop_index('ix_page_likes_page_id', table_name='page_likes')
+    op.drop_index('ix_page_collaborators_page_id', table_name='page_collaborators')
+    op.drop_index('ix_page_collaborators_user_id', table_name='page_collaborators')
+
+def downgrade():
+    op.create_index('ix_page_collaborators_user_id', 'page_collaborators', ['user_id'])
+    op.create_index('ix_page_collaborators_page_id', 'page_collaborators', ['page_id'])
+    op.create_index('ix_page_likes_page_id', 'page_likes', ['page_id'])
+    op.drop_index('ix_page_collaborators_user_page_access', table_name='page_collaborators')
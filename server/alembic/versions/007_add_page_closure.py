@@ -0,0 +1,88 @@
+"""Add page_closure table for the page hierarchy
+
+Revision ID: 007
+Revises: 006
+Create Date: 2024-02-01 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'page_closure',
+        sa.Column('ancestor_id', sa.Integer(), nullable=False),
+        sa.Column('descendant_id', sa.Integer(), nullable=False),
+        sa.Column('depth', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['ancestor_id'], ['pages.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['descendant_id'], ['pages.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('ancestor_id', 'descendant_id')
+    )
+    op.create_index('ix_page_closure_descendant', 'page_closure', ['descendant_id'])
+
+    # Backfill from the existing hierarchy
+    op.execute("""
+        WITH RECURSIVE paths(ancestor_id, descendant_id, depth) AS (
+            SELECT id, id, 0 FROM pages
+            UNION ALL
+            SELECT paths.ancestor_id, pages.id, paths.depth + 1
+            FROM pages JOIN paths ON pages.parent_id = paths.descendant_id
+        )
+        INSERT INTO page_closure (ancestor_id, descendant_id, depth)
+        SELECT ancestor_id, descendant_id, depth FROM paths
+    """)
+
+    # New page: link it to itself and to every ancestor of its parent
+    op.execute("""
+        CREATE FUNCTION page_closure_insert() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO page_closure (ancestor_id, descendant_id, depth)
+            SELECT ancestor_id, NEW.id, depth + 1
+            FROM page_closure WHERE descendant_id = NEW.parent_id
+            UNION ALL
+            SELECT NEW.id, NEW.id, 0;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER page_closure_insert AFTER INSERT ON pages
+        FOR EACH ROW EXECUTE FUNCTION page_closure_insert()
+    """)
+
+    # Moved page: detach its subtree from the old ancestors, attach it under the new parent
+    op.execute("""
+        CREATE FUNCTION page_closure_move() RETURNS trigger AS $$
+        BEGIN
+            DELETE FROM page_closure
+            WHERE descendant_id IN (SELECT descendant_id FROM page_closure WHERE ancestor_id = NEW.id)
+              AND ancestor_id NOT IN (SELECT descendant_id FROM page_closure WHERE ancestor_id = NEW.id);
+
+            INSERT INTO page_closure (ancestor_id, descendant_id, depth)
+            SELECT above.ancestor_id, below.descendant_id, above.depth + below.depth + 1
+            FROM page_closure AS above
+            CROSS JOIN page_closure AS below
+            WHERE above.descendant_id = NEW.parent_id AND below.ancestor_id = NEW.id;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER page_closure_move AFTER UPDATE OF parent_id ON pages
+        FOR EACH ROW WHEN (OLD.parent_id IS DISTINCT FROM NEW.parent_id)
+        EXECUTE FUNCTION page_closure_move()
+    """)
+
+def downgrade():
+    op.execute("DROP TRIGGER page_closure_move ON pages")
+    op.execute("DROP TRIGGER page_closure_insert ON pages")
+    op.execute("DROP FUNCTION page_closure_move()")
+    op.execute("DROP FUNCTION page_closure_insert()")
+    op.drop_index('ix_page_closure_descendant', table_name='page_closure')
+    op.drop_table('page_closure')
@@ -0,0 +1,26 @@
+"""Add full-text search vector to pages
+
+Revision ID: 008
+Revises: 007
+Create Date: 2024-02-01 15:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Generated column: kept in sync by Postgres on every insert/update
+    op.execute("""
+        ALTER TABLE pages ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(content, ''))) STORED
+    """)
+    op.execute("CREATE INDEX pages_search_gin ON pages USING gin (search_vector)")
+
+def downgrade():
+    op.drop_index('pages_search_gin', table_name='pages')
+    op.drop_column('pages', 'search_vector')
@@ -0,0 +1,41 @@
+"""Add indexes on hot page filter columns
+
+Revision ID: 009
+Revises: 008
+Create Date: 2024-02-01 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_index('ix_pages_parent_id', 'pages', ['parent_id'])
+    op.create_index('ix_pages_author_id', 'pages', ['author_id'])
+    op.create_index('ix_pages_public', 'pages', ['id'], postgresql_where=sa.text('is_public'))
+
+    # Give duplicate slugs (oldest page keeps the plain slug) a unique suffix
+    op.execute("""
+        UPDATE pages SET slug = pages.slug || '-' || pages.id
+        FROM pages older
+        WHERE pages.slug = older.slug AND pages.id > older.id
+    """)
+    # pattern_ops lets the same index serve slug equality and LIKE 'prefix%'
+    op.create_index(
+        'ix_pages_slug',
+        'pages',
+        ['slug'],
+        unique=True,
+        postgresql_ops={'slug': 'varchar_pattern_ops'}
+    )
+
+def downgrade():
+    op.drop_index('ix_pages_slug', table_name='pages')
+    op.drop_index('ix_pages_public', table_name='pages')
+    op.drop_index('ix_pages_author_id', table_name='pages')
+    op.drop_index('ix_pages_parent_id', table_name='pages')
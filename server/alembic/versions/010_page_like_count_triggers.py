@@ -0,0 +1,48 @@
+"""Maintain pages.like_count with triggers on page_likes
+
+Revision ID: 010
+Revises: 009
+Create Date: 2024-02-01 17:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.execute("""
+        CREATE FUNCTION page_likes_count() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                UPDATE pages SET like_count = like_count + 1 WHERE id = NEW.page_id;
+            ELSE
+                UPDATE pages SET like_count = like_count - 1 WHERE id = OLD.page_id;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER page_likes_ai AFTER INSERT ON page_likes
+        FOR EACH ROW EXECUTE FUNCTION page_likes_count()
+    """)
+    op.execute("""
+        CREATE TRIGGER page_likes_ad AFTER DELETE ON page_likes
+        FOR EACH ROW EXECUTE FUNCTION page_likes_count()
+    """)
+
+    # Resync counts so the triggers start from exact values
+    op.execute("""
+        UPDATE pages SET like_count = (
+            SELECT COUNT(*) FROM page_likes WHERE page_likes.page_id = pages.id
+        )
+    """)
+
+def downgrade():
+    op.execute("DROP TRIGGER page_likes_ad ON page_likes")
+    op.execute("DROP TRIGGER page_likes_ai ON page_likes")
+    op.execute("DROP FUNCTION page_likes_count()")
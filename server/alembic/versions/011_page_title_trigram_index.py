@@ -0,0 +1,27 @@
+"""Add trigram index on page titles for substring search
+
+Revision ID: 011
+Revises: 010
+Create Date: 2024-02-01 18:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        'pages_title_trgm',
+        'pages',
+        ['title'],
+        postgresql_using='gin',
+        postgresql_ops={'title': 'gin_trgm_ops'}
+    )
+
+def downgrade():
+    op.drop_index('pages_title_trgm', table_name='pages')
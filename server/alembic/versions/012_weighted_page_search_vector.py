@@ -0,0 +1,33 @@
+"""Weight title above content in the page search vector
+
+Revision ID: 012
+Revises: 011
+Create Date: 2024-02-01 19:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '012'
+down_revision = '011'
+branch_labels = None
+depends_on = None
+
+WEIGHTED = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(content, '')), 'B')"
+)
+UNWEIGHTED = "to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(content, ''))"
+
+def _replace_search_vector(expression):
+    # A generated column's expression can't be altered in place; recreate it
+    op.drop_index('pages_search_gin', table_name='pages')
+    op.drop_column('pages', 'search_vector')
+    op.execute(f"ALTER TABLE pages ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({expression}) STORED")
+    op.execute("CREATE INDEX pages_search_gin ON pages USING gin (search_vector)")
+
+def upgrade():
+    _replace_search_vector(WEIGHTED)
+
+def downgrade():
+    _replace_search_vector(UNWEIGHTED)
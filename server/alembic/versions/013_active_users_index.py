@@ -0,0 +1,21 @@
+"""Add partial index on active users
+
+Revision ID: 013
+Revises: 012
+Create Date: 2024-02-01 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '013'
+down_revision = '012'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_index('ix_users_active', 'users', ['id'], postgresql_where=sa.text('is_active'))
+
+def downgrade():
+    op.drop_index('ix_users_active', table_name='users')
@@ -1,12 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models.user import User
 from app.schemas.user import UserCreate, UserLogin  # Добавьте UserLogin
 from app.core import security
+from app.core.config import settings
+from app.core.rate_limit import RateLimiter
 
 router = APIRouter()
 
+# Bounds password-hashing work an attacker can trigger per client and username
+login_limiter = RateLimiter(settings.LOGIN_RATE_LIMIT_ATTEMPTS, settings.LOGIN_RATE_LIMIT_WINDOW_SECONDS)
+
 @router.post("/register")
 def register_user(user: UserCreate, db: Session = Depends(get_db)):
     # Check if user already exists
@@ -38,17 +43,30 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
 
 
 @router.post("/login")
-def login_user(user: UserLogin, db: Session = Depends(get_db)):  # Используйте UserLogin вместо UserCreate
+def login_user(user: UserLogin, request: Request, db: Session = Depends(get_db)):  # Используйте UserLogin вместо UserCreate
+    client_host = request.client.host if request.client else "unknown"
+    if not login_limiter.hit(f"{client_host}:{user.username}"):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts. Please try again later."
+        )
+
     db_user = db.query(User).filter(User.username == user.username).first()
     if not db_user:
         raise HTTPException(status_code=400, detail="Incorrect username or password")
 
-    if not security.verify_password(user.password, db_user.password_hash):
+    is_valid, new_hash = security.verify_and_update_password(user.password, db_user.password_hash)
+    if not is_valid:
         raise HTTPException(status_code=400, detail="Incorrect username or password")
 
     if not db_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
 
+    # Transparently upgrade legacy hashes (e.g. sha256_crypt) to the current scheme
+    if new_hash:
+        db_user.password_hash = new_hash
+        db.commit()
+
     # Create access token
     access_token = security.create_access_token(data={"sub": db_user.username})
 
@@ -1,32 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Security
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from app.database import get_db
-from app.models.user import User
-from app.models.page import Page
 from app.models.page_like import PageLike
-from app.core.security import get_current_user, decode_access_token
-from typing import List, Optional
-
-security = HTTPBearer(auto_error=False)
+from app.core.security import CurrentUser, get_current_user
+from app.api.pages import get_page_by_id_or_slug
+from app.core import cache
 
 router = APIRouter()
 
 
-def get_page_by_id_or_slug(page_id_or_slug: str, db: Session) -> Optional[Page]:
-    """Get page by ID (int) or slug (str)"""
-    try:
-        page_id = int(page_id_or_slug)
-        return db.query(Page).filter(Page.id == page_id).first()
-    except ValueError:
-        return db.query(Page).filter(Page.slug == page_id_or_slug).first()
+def exists_like(db: Session, page_id: int, user_id: int) -> bool:
+    """Check whether user liked the page (single EXISTS query, no row loading)"""
+    return db.query(
+        db.query(PageLike).filter(
+            PageLike.page_id == page_id,
+            PageLike.user_id == user_id
+        ).exists()
+    ).scalar()
 
 
 @router.post("/pages/{page_id}/like")
 def like_page(
     page_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Like a page"""
@@ -35,12 +31,7 @@ def like_page(
         raise HTTPException(status_code=404, detail="Page not found")
 
     # Check if already liked
-    existing_like = db.query(PageLike).filter(
-        PageLike.page_id == page.id,
-        PageLike.user_id == current_user.id
-    ).first()
-
-    if existing_like:
+    if exists_like(db, page.id, current_user.id):
         raise HTTPException(status_code=400, detail="Page already liked")
 
     like = PageLike(
@@ -50,15 +41,15 @@ def like_page(
 
     db.add(like)
     db.commit()
-    db.refresh(like)
+    cache.invalidate("tree:")
 
     return {"message": "Page liked", "liked": True}
 
 
-@router.delete("/pages/{page_id}/like")
+@router.delete("/pages/{page_id}/like", status_code=status.HTTP_204_NO_CONTENT)
 def unlike_page(
     page_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Unlike a page"""
@@ -66,24 +57,25 @@ def unlike_page(
     if not page:
         raise HTTPException(status_code=404, detail="Page not found")
     
-    like = db.query(PageLike).filter(
+    # Delete directly instead of loading the row first
+    deleted = db.query(PageLike).filter(
         PageLike.page_id == page.id,
         PageLike.user_id == current_user.id
-    ).first()
+    ).delete(synchronize_session=False)
 
-    if not like:
+    if not deleted:
         raise HTTPException(status_code=404, detail="Like not found")
 
-    db.delete(like)
     db.commit()
+    cache.invalidate("tree:")
 
-    return {"message": "Page unliked", "liked": False}
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
 @router.get("/pages/{page_id}/likes")
 def get_page_likes(
     page_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get like count and whether current user liked the page"""
@@ -91,39 +83,10 @@ def get_page_likes(
     if not page:
         raise HTTPException(status_code=404, detail="Page not found")
 
-    like_count = db.query(PageLike).filter(PageLike.page_id == page.id).count()
-    user_liked = db.query(PageLike).filter(
-        PageLike.page_id == page.id,
-        PageLike.user_id == current_user.id
-    ).first() is not None
+    user_liked = exists_like(db, page.id, current_user.id)
 
     return {
         "page_id": page.id,
-        "like_count": like_count,
+        "like_count": page.like_count,
         "user_liked": user_liked
     }
-
-
-def get_current_user_optional(
-    credentials: Optional[HTTPAuthorizationCredentials] = Security(security),
-    db: Session = Depends(get_db)
-) -> Optional[User]:
-    """Get current user if authenticated, None otherwise"""
-    if credentials is None:
-        return None
-    try:
-        payload = decode_access_token(credentials.credentials)
-        if payload is None:
-            return None
-        username: str = payload.get("sub")
-        if username is None:
-            return None
-        user = db.query(User).filter(User.username == username).first()
-        return user
-    except Exception:
-        return None
-
-
-
-
-
@@ -1,376 +1,377 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Security, Query
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, or_
-from app.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Response, status, Query
+from sqlalchemy.orm import Session, joinedload, selectinload, raiseload
+from sqlalchemy import exists, false, or_, select, true, literal_column, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.sql.expression import ColumnElement
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app.database import get_db, get_read_db
 from app.models.user import User
 from app.models.page import Page
 from app.models.page_version import PageVersion
 from app.models.collaborator import PageCollaborator
 from app.models.page_like import PageLike
+from app.models.page_closure import PageClosure
 from app.schemas.page import PageCreate, PageUpdate
 from app.schemas.collaborator import CollaboratorCreate
-from app.core.security import get_current_user, decode_access_token
-from typing import List, Optional
+from app.core.security import CurrentUser, get_current_user, get_current_user_optional
+from app.core import cache
+from app.core.config import settings
+from app.core.responses import dumps, raw_json_response
+from typing import Dict, List, Optional, Tuple
 import logging
+import re
+from collections import defaultdict
 
 router = APIRouter()
-security = HTTPBearer(auto_error=False)
+logger = logging.getLogger(__name__)
 
+_SLUG_RE = re.compile(r'[^a-zA-Z0-9]+')
 
-def get_current_user_optional(
-    credentials: Optional[HTTPAuthorizationCredentials] = Security(security),
-    db: Session = Depends(get_db)
-) -> Optional[User]:
-    """Get current user if authenticated, otherwise return None for guest access"""
-    if not credentials:
-        return None
-    try:
-        token = credentials.credentials
-        if not token:
-            return None
-        payload = decode_access_token(token)
-        if payload is None:
-            # Token is invalid - log but don't fail
-            import logging
-            logging.warning("Failed to decode access token - token may be expired or invalid")
-            return None
-        username: str = payload.get("sub")
-        if username is None:
-            return None
-        user = db.query(User).filter(User.username == username).first()
-        if user is None:
-            import logging
-            logging.warning(f"User {username} not found in database")
-            return None
-        return user
-    except Exception as e:
-        # Log error for debugging but don't fail - allow guest access
-        import logging
-        logging.error(f"Error getting current user: {e}", exc_info=True)
-        return None
 
+def group_by_parent(pages: List[Page]) -> Dict[Optional[int], List[Page]]:
+    """Group pages by parent_id in a single pass"""
+    children = defaultdict(list)
+    for page in pages:
+        children[page.parent_id].append(page)
+    return children
 
-def can_access_page(page: Page, user: Optional[User], db: Session) -> bool:
-    """Check if user can access the page"""
-    if page.is_public:
-        return True
-    if user is None:
-        return False
-    if user.role == "admin":
-        return True
-    if page.author_id == user.id:
-        return True
 
-    # Check if user is collaborator
-    collaborator = db.query(PageCollaborator).filter(
-        PageCollaborator.page_id == page.id,
-        PageCollaborator.user_id == user.id
-    ).first()
+def build_page_tree(pages: List[Page], parent_id: Optional[int] = None) -> List[dict]:
+    """Build a tree structure from flat pages list"""
+    children = group_by_parent(pages)
+
+    def build(parent_id):
+        return [
+            {**page.to_dict(), "children": build(page.id)}
+            for page in children[parent_id]
+        ]
+
+    return build(parent_id)
+
+
+# Columns needed by build_tree_with_likes; tree queries select only these
+# instead of whole pages with their content
+TREE_COLUMNS = (Page.id, Page.parent_id, Page.title, Page.is_public, Page.author_id, Page.like_count)
+# Sibling order shown in the tree view (most liked first). Tree queries return
+# rows already sorted, and group_by_parent keeps that order within each parent
+TREE_ORDER = (Page.like_count.desc(), Page.id)
+
+
+def build_tree_with_likes(pages) -> List[dict]:
+    """Build simplified tree for the tree view, starting from root pages.
+
+    pages may be Page objects or TREE_COLUMNS rows. Each page is visited once
+    (O(N)) instead of rescanning the whole list for the children of every node.
+    """
+    children = group_by_parent(pages)
+
+    def build(parent_id):
+        return [
+            {
+                "id": page.id,
+                "title": page.title,
+                "is_public": page.is_public,
+                "author_id": page.author_id,
+                "children": build(page.id),
+                # Always include like count, even if 0
+                "like_count": page.like_count
+            }
+            for page in children[parent_id]
+        ]
+
+    return build(None)
+
+
+def query_with_descendants(root_filter, db: Session):
+    """Query pages matching root_filter and all of their descendants.
+
+    Descendants are read from the page_closure table (which also pairs every
+    page with itself), so the whole subtree is one indexed lookup instead of a
+    hierarchy walk.
+    """
+    descendant_ids = (
+        select(PageClosure.descendant_id)
+        .join(Page, Page.id == PageClosure.ancestor_id)
+        .where(root_filter)
+        .correlate(None)
+    )
+    return db.query(Page).filter(Page.id.in_(descendant_ids))
 
-    return collaborator is not None
 
+def fetch_with_has_more(query, limit: int, response: Response) -> list:
+    """Fetch at most limit rows and report in the X-Has-More header whether more exist.
 
-def can_edit_page(page: Page, user: Optional[User], db: Session) -> bool:
-    """Check if user can edit the page"""
-    if user is None:
-        return False
-    if user.role == "admin":
-        return True
-    if page.author_id == user.id:
-        return True
-
-    # Check if user is collaborator with write access
-    collaborator = db.query(PageCollaborator).filter(
-        PageCollaborator.page_id == page.id,
-        PageCollaborator.user_id == user.id,
-        PageCollaborator.access_level == 'write'
-    ).first()
+    One extra row is fetched instead of running a separate COUNT(*).
+    """
+    rows = query.limit(limit + 1).all()
+    response.headers["X-Has-More"] = "true" if len(rows) > limit else "false"
+    return rows[:limit]
 
-    return collaborator is not None
 
+def slugify(title: str) -> str:
+    """Convert title to URL slug"""
+    return _SLUG_RE.sub('-', title).lower().strip('-')
 
-def build_page_tree(pages: List[Page], parent_id: Optional[int] = None) -> List[dict]:
-    """Build a tree structure from flat pages list"""
-    tree = []
-    for page in pages:
-        if page.parent_id == parent_id:
-            node = page.to_dict()
-            node["children"] = build_page_tree(pages, page.id)
-            tree.append(node)
-    return tree
 
+def generate_unique_slug(base_slug: str, db: Session, exclude_page_id: Optional[int] = None) -> str:
+    """Return base_slug, or base_slug-N with the smallest free N.
 
-def get_page_by_id_or_slug(page_id_or_slug: str, db: Session) -> Optional[Page]:
-    """Get page by ID (int) or slug (str)"""
+    All conflicting slugs are fetched in one query instead of probing each
+    candidate separately. The LIKE prefix can use an index on slug; the regex
+    drops unrelated slugs that merely share the prefix (e.g. base-guide).
+    """
+    query = db.query(Page.slug).filter(
+        Page.slug.like(f"{base_slug}%"),
+        Page.slug.op('~')(f"^{re.escape(base_slug)}(-[0-9]+)?$")
+    )
+    if exclude_page_id is not None:
+        query = query.filter(Page.id != exclude_page_id)
+    taken = {row[0] for row in query.all()}
+
+    slug = base_slug
+    counter = 1
+    while slug in taken:
+        slug = f"{base_slug}-{counter}"
+        counter += 1
+    return slug
+
+
+# Attempts at claiming a free slug before giving up on a burst of concurrent writes
+SLUG_RETRIES = 5
+
+
+def flush_with_unique_slug(db_page: Page, base_slug: str, db: Session) -> None:
+    """Assign db_page a unique slug derived from base_slug and flush it.
+
+    generate_unique_slug only picks a candidate; the unique ix_pages_slug index
+    is what enforces uniqueness. If a concurrent create or rename claims the
+    same slug first, the flush is rolled back to a savepoint and the next free
+    slug is tried. Other pending changes must be flushed before calling this.
+    """
+    for _ in range(SLUG_RETRIES):
+        slug = generate_unique_slug(base_slug, db, exclude_page_id=db_page.id)
+        try:
+            with db.begin_nested():
+                db_page.slug = slug
+                db.add(db_page)
+                db.flush()
+            return
+        except IntegrityError as e:
+            constraint = getattr(getattr(e.orig, "diag", None), "constraint_name", None)
+            if constraint != "ix_pages_slug":
+                raise
+    raise HTTPException(status_code=409, detail="Could not assign a unique slug, please retry")
+
+
+def invalidate_page_caches() -> None:
+    """Drop cached trees and guest search results after page content changes"""
+    cache.invalidate("tree:")
+    cache.search_results.clear()
+
+
+def page_lookup_filter(page_id_or_slug) -> ColumnElement:
+    """Filter matching a page by ID (int) or slug (str)"""
     try:
-        page_id = int(page_id_or_slug)
-        return db.query(Page).filter(Page.id == page_id).first()
+        return Page.id == int(page_id_or_slug)
     except ValueError:
-        return db.query(Page).filter(Page.slug == page_id_or_slug).first()
+        return Page.slug == page_id_or_slug
+
+
+def get_page_by_id_or_slug(page_id_or_slug: str, db: Session) -> Optional[Page]:
+    """Get page by ID (int) or slug (str)"""
+    return db.query(Page).filter(page_lookup_filter(page_id_or_slug)).first()
+
 
+def access_clause(user: Optional[CurrentUser], need_write: bool = False) -> ColumnElement:
+    """SQL condition for whether user may read a page (or edit it if need_write).
 
-# Moved to main.py to avoid route conflicts
+    Read: public pages, own pages and pages the user collaborates on; write:
+    own pages and write collaborations. Admins may do both.
+    """
+    if user is None:
+        return false() if need_write else Page.is_public == True
+    if user.role == "admin":
+        return true()
+    collaborator = exists().where(
+        PageCollaborator.page_id == Page.id,
+        PageCollaborator.user_id == user.id
+    )
+    if need_write:
+        collaborator = collaborator.where(PageCollaborator.access_level == 'write')
+        return or_(Page.author_id == user.id, collaborator)
+    return or_(Page.is_public == True, Page.author_id == user.id, collaborator)
+
+
+def get_page_if_accessible(
+    page_id_or_slug: str,
+    user: Optional[CurrentUser],
+    db: Session,
+    need_write: bool = False
+) -> Tuple[Optional[Page], bool]:
+    """Get page by ID or slug together with whether user may read (or write) it.
+
+    The access check is evaluated in the same query, so callers can tell a
+    missing page (None) from a forbidden one (page, False) in one round trip.
+    """
+    row = db.query(Page, access_clause(user, need_write).label("allowed")).filter(
+        page_lookup_filter(page_id_or_slug)
+    ).first()
+    if row is None:
+        return None, False
+    return row[0], bool(row[1])
+
+
+@router.get("")
+@router.get("/")
 def get_pages(
-    current_user: Optional[User] = Depends(get_current_user_optional),
+    current_user: Optional[CurrentUser] = Depends(get_current_user_optional),
     db: Session = Depends(get_db),
+    read_db: Session = Depends(get_read_db),
     my_only: bool = Query(False, description="Return only pages created by current user")
 ):
     """Get pages in tree structure. For guests: only public pages. For users: accessible pages."""
-    
-    # Debug logging
-    if current_user:
-        logging.info(f"Getting pages for user: {current_user.username} (id: {current_user.id}, role: {current_user.role}), my_only={my_only}")
+    if current_user is None:
+        cache_key = "tree:guest"
+        # Guests never see their own writes, so a lagging replica is fine, except
+        # when refilling right after a write: a stale tree would then stay cached
+        if not cache.invalidated_within(settings.CACHE_TTL_SECONDS):
+            db = read_db
+    elif current_user.role == "admin":
+        cache_key = "tree:admin"
     else:
-        logging.info("Getting pages for guest user")
-    
+        cache_key = f"tree:u:{current_user.id}:{my_only}"
+    # The tree is cached already serialized, so cache hits skip JSON encoding too
+    body = cache.get_cached(cache_key, lambda: dumps(build_pages_tree(current_user, db, my_only)))
+    return raw_json_response(body)
+
+
+def build_pages_tree(current_user: Optional[CurrentUser], db: Session, my_only: bool = False) -> List[dict]:
+    """Build the page tree visible to the given user (see get_pages)"""
     if current_user is None:
         # Guest: only public pages and their children
-        public_pages = db.query(Page).filter(Page.is_public == True).all()
-        public_page_ids = {p.id for p in public_pages}
-        
-        # Recursively include all children of public pages
-        if public_page_ids:
-            while True:
-                child_pages = db.query(Page).filter(
-                    Page.parent_id.in_(public_page_ids),
-                    ~Page.id.in_(public_page_ids)
-                ).all()
-                if not child_pages:
-                    break
-                for child in child_pages:
-                    public_page_ids.add(child.id)
-            
-            pages = db.query(Page).filter(Page.id.in_(public_page_ids)).all()
-        else:
-            pages = []
+        pages = query_with_descendants(Page.is_public == True, db).with_entities(*TREE_COLUMNS).order_by(*TREE_ORDER).all()
     elif current_user.role == "admin":
         # Admin: all pages
-        pages = db.query(Page).options(joinedload(Page.author)).all()
+        pages = db.query(*TREE_COLUMNS).order_by(*TREE_ORDER).all()
     else:
         # User: public pages, own pages, and pages where user is collaborator
-        try:
-            # If my_only is True, return only pages created by current user
-            if my_only:
-                pages = db.query(Page).options(joinedload(Page.author)).filter(
-                    Page.author_id == current_user.id
-                ).all()
-                # Verify that all pages belong to current user
-                for page in pages:
-                    if page.author_id != current_user.id:
-                        logging.error(f"ERROR: Page {page.id} has author_id {page.author_id}, but current user is {current_user.id}")
-                logging.info(f"User {current_user.id} ({current_user.username}): found {len(pages)} own pages (my_only=True). Page IDs: {[p.id for p in pages]}")
-            else:
-                # Get page IDs where user is collaborator
-                collaborator_page_ids_query = db.query(PageCollaborator.page_id).filter(
-                    PageCollaborator.user_id == current_user.id
-                )
-                collaborator_page_ids = [row[0] for row in collaborator_page_ids_query.all()]
-                
-                # Get accessible pages - use simpler query
-                # User should see: public pages OR own pages OR pages where user is collaborator
-                access_conditions = [
-                    Page.is_public == True,
-                    Page.author_id == current_user.id
-                ]
-                
-                # Add collaborator condition only if user has collaborations
-                if collaborator_page_ids:
-                    access_conditions.append(Page.id.in_(collaborator_page_ids))
-                
-                # Debug: check how many public pages exist
-                public_count = db.query(Page).filter(Page.is_public == True).count()
-                own_count = db.query(Page).filter(Page.author_id == current_user.id).count()
-                logging.info(f"Debug - Public pages in DB: {public_count}, Own pages: {own_count}, Collaborator pages: {len(collaborator_page_ids)}")
-                
-                # Use joinedload to eagerly load author relationship
-                accessible_pages = db.query(Page).options(joinedload(Page.author)).filter(
-                    or_(*access_conditions)
-                ).all()
-                
-                logging.info(f"User {current_user.id} ({current_user.username}): found {len(accessible_pages)} accessible pages (public: {sum(1 for p in accessible_pages if p.is_public)}, own: {sum(1 for p in accessible_pages if p.author_id == current_user.id)}, collaborators: {len(collaborator_page_ids)})")
-                
-                # Also include child pages of accessible pages (even if child itself is not directly accessible)
-                accessible_page_ids = {p.id for p in accessible_pages}
-                
-                # Recursively include all children
-                if accessible_page_ids:
-                    while True:
-                        child_pages = db.query(Page).filter(
-                            Page.parent_id.in_(accessible_page_ids),
-                            ~Page.id.in_(accessible_page_ids)
-                        ).all()
-                        if not child_pages:
-                            break
-                        for child in child_pages:
-                            accessible_page_ids.add(child.id)
-                    
-                    # Get all pages by IDs with author relationship loaded
-                    pages = db.query(Page).options(joinedload(Page.author)).filter(Page.id.in_(accessible_page_ids)).all()
-                    logging.info(f"After including children: {len(pages)} total pages for user {current_user.id}")
-                else:
-                    pages = []
-                    logging.warning(f"No accessible pages found for user {current_user.id} ({current_user.username})")
-        except Exception as e:
-            logging.error(f"Error getting pages for user {current_user.id}: {e}", exc_info=True)
-            # Fallback to empty list on error
-            pages = []
+        # If my_only is True, return only pages created by current user
+        if my_only:
+            pages = db.query(*TREE_COLUMNS).filter(
+                Page.author_id == current_user.id
+            ).order_by(*TREE_ORDER).all()
+        else:
+            # Pages where user is collaborator, kept as a subquery so the IDs
+            # never round-trip through Python as a large IN list
+            collaborator_page_ids = select(PageCollaborator.page_id).where(
+                PageCollaborator.user_id == current_user.id
+            ).scalar_subquery()
+            
+            # User should see: public pages OR own pages OR pages where user is collaborator
+            access_conditions = [
+                Page.is_public == True,
+                Page.author_id == current_user.id,
+                Page.id.in_(collaborator_page_ids)
+            ]
+            
+            # Also include child pages of accessible pages (even if child itself is not directly accessible)
+            pages = query_with_descendants(or_(*access_conditions), db).with_entities(*TREE_COLUMNS).order_by(*TREE_ORDER).all()
 
     # Build tree structure - only show root pages (parent_id is None)
     # According to architecture: [{"id": "uuid", "title": "string", "children": [...], "is_public": bool}, ...]
     try:
-        logging.info(f"Building tree from {len(pages)} pages")
-        user_id = current_user.id if current_user else None
-        def build_tree_with_likes(pages_list, parent_id=None):
-            tree = []
-            for page in pages_list:
-                if page.parent_id == parent_id:
-                    # Simplified structure for tree view
-                    node = {
-                        "id": page.id,
-                        "title": page.title,
-                        "is_public": page.is_public,
-                        "author_id": page.author_id,
-                        "children": build_tree_with_likes(pages_list, page.id)
-                    }
-                    # Debug: log author_id
-                    logging.debug(f"Page {page.id} ({page.title}): author_id={page.author_id}")
-                    # Add like count (always include, even if 0)
-                    try:
-                        if db:
-                            from app.models.page_like import PageLike
-                            like_count = db.query(PageLike).filter(PageLike.page_id == page.id).count()
-                            node["like_count"] = like_count
-                    except Exception as e:
-                        logging.warning(f"Error getting like count for page {page.id}: {e}")
-                        node["like_count"] = 0
-                    tree.append(node)
-            return tree
-        
-        tree = build_tree_with_likes(pages, None)
-        logging.info(f"Built tree with {len(tree)} root nodes from {len(pages)} total pages")
-        
-        # Debug: log page IDs and their parent_ids
-        if pages:
-            page_info = [(p.id, p.title[:30], p.parent_id, p.author_id) for p in pages[:10]]
-            logging.info(f"Sample pages: {page_info}")
-        
-        # Additional verification for my_only mode
-        if current_user and my_only:
-            for node in tree:
-                if 'author_id' in node and node['author_id'] != current_user.id:
-                    logging.error(f"ERROR: Tree node {node.get('id')} has author_id {node.get('author_id')}, but current user is {current_user.id}")
-        
-        return tree
+        tree = build_tree_with_likes(pages)
     except Exception as e:
-        logging.error(f"Error building page tree: {e}", exc_info=True)
+        logger.exception("Error building page tree")
         raise HTTPException(status_code=500, detail=f"Error building page tree: {str(e)}")
+    logger.debug("Built tree with %d root nodes from %d pages (user=%s, my_only=%s)",
+                 len(tree), len(pages), current_user.id if current_user else None, my_only)
+    return tree
 
 
 def get_my_pages(
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get only pages created by the current user in tree structure."""
-    
-    logging.info(f"Getting own pages for user: {current_user.username} (id: {current_user.id})")
-    
+    body = cache.get_cached(f"tree:u:{current_user.id}:mine", lambda: dumps(build_my_pages_tree(current_user, db)))
+    return raw_json_response(body)
+
+
+def build_my_pages_tree(current_user: CurrentUser, db: Session) -> List[dict]:
+    """Build the tree of pages created by the given user (see get_my_pages)"""
     # Get only pages created by current user
-    pages = db.query(Page).options(joinedload(Page.author)).filter(
+    pages = db.query(*TREE_COLUMNS).filter(
         Page.author_id == current_user.id
-    ).all()
-    
-    logging.info(f"Found {len(pages)} pages created by user {current_user.id}")
+    ).order_by(*TREE_ORDER).all()
     
     # Build tree structure - only show root pages (parent_id is None)
     try:
-        def build_tree_with_likes(pages_list, parent_id=None):
-            tree = []
-            for page in pages_list:
-                if page.parent_id == parent_id:
-                    # Simplified structure for tree view
-                    node = {
-                        "id": page.id,
-                        "title": page.title,
-                        "is_public": page.is_public,
-                        "author_id": page.author_id,
-                        "children": build_tree_with_likes(pages_list, page.id)
-                    }
-                    # Add like count (always include, even if 0)
-                    try:
-                        if db:
-                            from app.models.page_like import PageLike
-                            like_count = db.query(PageLike).filter(PageLike.page_id == page.id).count()
-                            node["like_count"] = like_count
-                    except Exception as e:
-                        logging.warning(f"Error getting like count for page {page.id}: {e}")
-                        node["like_count"] = 0
-                    tree.append(node)
-            return tree
-        
-        tree = build_tree_with_likes(pages, None)
-        logging.info(f"Built tree with {len(tree)} root nodes from {len(pages)} total pages")
-        
-        return tree
+        tree = build_tree_with_likes(pages)
     except Exception as e:
-        logging.error(f"Error building page tree: {e}", exc_info=True)
+        logger.exception("Error building page tree")
         raise HTTPException(status_code=500, detail=f"Error building page tree: {str(e)}")
+    logger.debug("Built own-pages tree with %d root nodes from %d pages (user=%s)",
+                 len(tree), len(pages), current_user.id)
+    return tree
 
 
 @router.get("/{page_id_or_slug}")
 def get_page(
     page_id_or_slug: str,
-    current_user: Optional[User] = Depends(get_current_user_optional),
+    current_user: Optional[CurrentUser] = Depends(get_current_user_optional),
     db: Session = Depends(get_db)
 ):
-    page = get_page_by_id_or_slug(page_id_or_slug, db)
-    if not page:
+    # Page, author, access check and the user's like in a single round trip
+    if current_user is None:
+        liked = false()
+    else:
+        liked = exists().where(PageLike.page_id == Page.id, PageLike.user_id == current_user.id)
+    row = db.query(
+        Page,
+        access_clause(current_user).label("allowed"),
+        liked.label("user_liked")
+    ).options(joinedload(Page.author)).filter(page_lookup_filter(page_id_or_slug)).first()
+    if row is None:
         raise HTTPException(status_code=404, detail="Page not found")
 
-    if not can_access_page(page, current_user, db):
+    page, allowed, user_liked = row
+    if not allowed:
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    user_id = current_user.id if current_user else None
-    return page.to_dict(include_like_count=True, db=db, user_id=user_id)
+    if current_user is None:
+        user_liked = None
+    return page.to_dict(include_like_count=True, user_liked=user_liked)
 
 
-# Moved to main.py to avoid route conflicts
-def create_page(page: PageCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+@router.post("")
+@router.post("/")
+def create_page(page: PageCreate, current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
     # If creating a child page, check permissions
     if page.parent_id:
-        parent_page = db.query(Page).filter(Page.id == page.parent_id).first()
+        parent_page, allowed = get_page_if_accessible(page.parent_id, current_user, db, need_write=True)
         if not parent_page:
             raise HTTPException(status_code=404, detail="Parent page not found")
         
         # Check if user can create child pages (must be author or write collaborator)
-        if not can_edit_page(parent_page, current_user, db):
+        if not allowed:
             raise HTTPException(
                 status_code=403,
                 detail="You don't have permission to create child pages for this page. Only the author or collaborators with write access can create child pages."
             )
     
-    # Generate slug from title
-    import re
-    slug = re.sub(r'[^a-zA-Z0-9]+', '-', page.title).lower().strip('-')
-
-    # Ensure slug is unique
-    counter = 1
-    base_slug = slug
-    while db.query(Page).filter(Page.slug == slug).first():
-        slug = f"{base_slug}-{counter}"
-        counter += 1
-
     db_page = Page(
         title=page.title,
         content=page.content,
-        slug=slug,
         parent_id=page.parent_id,
         is_public=page.is_public,
         author_id=current_user.id
     )
 
-    db.add(db_page)
+    # Generate unique slug from title
+    flush_with_unique_slug(db_page, slugify(page.title), db)
     db.commit()
+    invalidate_page_caches()
     db.refresh(db_page)
 
     return db_page.to_dict()
@@ -380,14 +381,14 @@ def create_page(page: PageCreate, current_user: User = Depends(get_current_user)
 def update_page(
     page_id: str,
     page: PageUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    db_page = get_page_by_id_or_slug(page_id, db)
+    db_page, allowed = get_page_if_accessible(page_id, current_user, db, need_write=True)
     if not db_page:
         raise HTTPException(status_code=404, detail="Page not found")
 
-    if not can_edit_page(db_page, current_user, db):
+    if not allowed:
         raise HTTPException(status_code=403, detail="Not authorized to edit this page")
 
     # Create version before updating
@@ -408,17 +409,13 @@ def update_page(
         db_page.is_public = page.is_public
 
     # Update slug if title changed
-    import re
-    new_slug = re.sub(r'[^a-zA-Z0-9]+', '-', page.title).lower().strip('-')
+    new_slug = slugify(page.title)
     if new_slug != db_page.slug:
-        counter = 1
-        base_slug = new_slug
-        while db.query(Page).filter(Page.slug == new_slug, Page.id != db_page.id).first():
-            new_slug = f"{base_slug}-{counter}"
-            counter += 1
-        db_page.slug = new_slug
+        db.flush()
+        flush_with_unique_slug(db_page, new_slug, db)
 
     db.commit()
+    invalidate_page_caches()
     db.refresh(db_page)
 
     return db_page.to_dict()
@@ -427,7 +424,7 @@ def update_page(
 @router.delete("/{page_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_page(
     page_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     db_page = get_page_by_id_or_slug(page_id, db)
@@ -440,27 +437,46 @@ def delete_page(
 
     db.delete(db_page)
     db.commit()
+    invalidate_page_caches()
 
-    return None
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
 @router.get("/{page_id}/history")
 def get_page_history(
     page_id: str,
-    current_user: Optional[User] = Depends(get_current_user_optional),
+    response: Response,
+    limit: int = Query(50, ge=1, le=500),
+    before_id: Optional[int] = Query(None, description="Return versions older than this version (keyset cursor)"),
+    current_user: Optional[CurrentUser] = Depends(get_current_user_optional),
     db: Session = Depends(get_db)
 ):
-    page = get_page_by_id_or_slug(page_id, db)
+    page, allowed = get_page_if_accessible(page_id, current_user, db)
     if not page:
         raise HTTPException(status_code=404, detail="Page not found")
 
-    # History requires read access (can_access_page checks read permissions)
-    if not can_access_page(page, current_user, db):
+    # History requires read access
+    if not allowed:
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    versions = db.query(PageVersion).filter(
+    # Load all authors in one extra query; raiseload guards against new lazy loads
+    query = db.query(PageVersion).options(
+        selectinload(PageVersion.author),
+        raiseload('*')
+    ).filter(
         PageVersion.page_id == page.id
-    ).order_by(PageVersion.created_at.desc()).all()
+    )
+    if before_id is not None:
+        # Keyset pagination on (created_at, id) stays stable while new versions are added
+        cursor_created_at = select(PageVersion.created_at).where(PageVersion.id == before_id).scalar_subquery()
+        query = query.filter(
+            tuple_(PageVersion.created_at, PageVersion.id) < tuple_(cursor_created_at, before_id)
+        )
+    versions = fetch_with_has_more(
+        query.order_by(PageVersion.created_at.desc(), PageVersion.id.desc()),
+        limit,
+        response
+    )
 
     return [
         {
@@ -473,7 +489,7 @@ def get_page_history(
             "title": v.title,
             "text": v.text,
             "version_comment": v.version_comment,
-            "created_at": v.created_at.isoformat()
+            "created_at": v.created_at
         }
         for v in versions
     ]
@@ -483,14 +499,14 @@ def get_page_history(
 def restore_version(
     page_id: str,
     version_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    page = get_page_by_id_or_slug(page_id, db)
+    page, allowed = get_page_if_accessible(page_id, current_user, db, need_write=True)
     if not page:
         raise HTTPException(status_code=404, detail="Page not found")
 
-    if not can_edit_page(page, current_user, db):
+    if not allowed:
         raise HTTPException(status_code=403, detail="Not authorized to edit this page")
 
     version = db.query(PageVersion).filter(
@@ -516,28 +532,38 @@ def restore_version(
     page.content = version.text
 
     db.commit()
+    invalidate_page_caches()
     db.refresh(page)
 
     return {"message": "Version restored", "page": page.to_dict()}
 
 
-# Moved to main.py to avoid route conflicts
 @router.get("/{page_id}/collaborators")
 def get_collaborators(
     page_id: str,
-    current_user: User = Depends(get_current_user),
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    page = get_page_by_id_or_slug(page_id, db)
+    page, allowed = get_page_if_accessible(page_id, current_user, db, need_write=True)
     if not page:
         raise HTTPException(status_code=404, detail="Page not found")
 
-    if not can_edit_page(page, current_user, db):
+    if not allowed:
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    collaborators = db.query(PageCollaborator).filter(
-        PageCollaborator.page_id == page.id
-    ).all()
+    collaborators = fetch_with_has_more(
+        db.query(PageCollaborator).options(
+            selectinload(PageCollaborator.user),
+            raiseload('*')
+        ).filter(
+            PageCollaborator.page_id == page.id
+        ).order_by(PageCollaborator.id).offset(offset),
+        limit,
+        response
+    )
 
     return [
         {
@@ -548,7 +574,7 @@ def get_collaborators(
                 "email": c.user.email
             },
             "access_level": c.access_level,
-            "created_at": c.created_at.isoformat()
+            "created_at": c.created_at
         }
         for c in collaborators
     ]
@@ -558,14 +584,14 @@ def get_collaborators(
 def add_collaborator(
     page_id: str,
     collaborator_data: CollaboratorCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    page = get_page_by_id_or_slug(page_id, db)
+    page, allowed = get_page_if_accessible(page_id, current_user, db, need_write=True)
     if not page:
         raise HTTPException(status_code=404, detail="Page not found")
 
-    if not can_edit_page(page, current_user, db):
+    if not allowed:
         raise HTTPException(status_code=403, detail="Not authorized")
 
     if collaborator_data.access_level not in ["read", "write"]:
@@ -576,33 +602,27 @@ def add_collaborator(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # Check if already a collaborator
-    existing = db.query(PageCollaborator).filter(
-        PageCollaborator.page_id == page.id,
-        PageCollaborator.user_id == collaborator_data.user_id
-    ).first()
-
-    if existing:
-        existing.access_level = collaborator_data.access_level
-        db.commit()
-        return {"message": "Collaborator access updated"}
-
-    # Create new collaborator
-    collaborator = PageCollaborator(
+    # Insert or update access level in one statement; xmax = 0 only for freshly inserted rows
+    stmt = pg_insert(PageCollaborator).values(
         page_id=page.id,
         user_id=collaborator_data.user_id,
         access_level=collaborator_data.access_level
-    )
-
-    db.add(collaborator)
+    ).on_conflict_do_update(
+        index_elements=['page_id', 'user_id'],
+        set_={'access_level': collaborator_data.access_level}
+    ).returning(PageCollaborator.id, literal_column("xmax = 0").label("inserted"))
+    collaborator_id, inserted = db.execute(stmt).one()
     db.commit()
-    db.refresh(collaborator)
+    cache.invalidate("tree:")
+
+    if not inserted:
+        return {"message": "Collaborator access updated"}
 
     return {"message": "Collaborator added", "collaborator": {
-        "id": collaborator.id,
+        "id": collaborator_id,
         "user": {
             "id": user.id,
             "username": user.username
         },
-        "access_level": collaborator.access_level
+        "access_level": collaborator_data.access_level
     }}
\ No newline at end of file
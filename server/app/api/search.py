@@ -1,180 +1,137 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Security
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models.user import User
 from app.models.page import Page
 from app.models.collaborator import PageCollaborator
-from app.core.security import decode_access_token
-from sqlalchemy import or_, text
-from typing import Optional
+from app.core.security import CurrentUser, get_current_user_optional
+from app.core import cache
+from app.core.config import settings
+from app.core.responses import dumps, raw_json_response
+from sqlalchemy import and_, func, or_
+from typing import List, Optional
+import logging
 
 router = APIRouter(redirect_slashes=False)
-security = HTTPBearer(auto_error=False)
+logger = logging.getLogger(__name__)
 
-
-def get_current_user_optional(
-    credentials: Optional[HTTPAuthorizationCredentials] = Security(security),
-    db: Session = Depends(get_db)
-) -> Optional[User]:
-    """Get current user if authenticated, otherwise return None for guest access"""
-    if not credentials:
-        return None
-    try:
-        token = credentials.credentials
-        if not token:
-            return None
-        payload = decode_access_token(token)
-        if payload is None:
-            # Token is invalid - log but don't fail
-            import logging
-            logging.warning("Failed to decode access token in search - token may be expired or invalid")
-            return None
-        username: str = payload.get("sub")
-        if username is None:
-            return None
-        user = db.query(User).filter(User.username == username).first()
-        if user is None:
-            import logging
-            logging.warning(f"User {username} not found in database (search)")
-            return None
-        return user
-    except Exception as e:
-        # Log error for debugging but don't fail - allow guest access
-        import logging
-        logging.error(f"Error getting current user in search: {e}", exc_info=True)
-        return None
+# ts_headline options: mark every match in the title, a short fragment of the content
+HEADLINE_TITLE_OPTIONS = "HighlightAll=true, StartSel=<mark>, StopSel=</mark>"
+HEADLINE_CONTENT_OPTIONS = "MaxWords=35, MinWords=15, StartSel=<mark>, StopSel=</mark>"
 
 
+@router.get("")
 @router.get("/")
 def search_pages(
     q: str = Query(..., min_length=1),
-    current_user: Optional[User] = Depends(get_current_user_optional),
-    db: Session = Depends(get_db)
+    current_user: Optional[CurrentUser] = Depends(get_current_user_optional),
+    db: Session = Depends(get_db),
+    read_db: Session = Depends(get_read_db)
 ):
     """Search pages. For guests: only public pages. For users: accessible pages."""
-    import logging
-    
-    # Debug logging
-    if current_user:
-        logging.info(f"Search for user: {current_user.username} (role: {current_user.role}), query: {q}")
-    else:
-        logging.info(f"Search for guest user, query: {q}")
+    # Matching is case-insensitive either way; normalizing lets equivalent
+    # queries share one guest cache entry
+    q = q.strip().lower()
+    if not q:
+        return []
+
+    # Whole words match the full-text vector; partial words still match titles
+    # by substring. Both sides are served by GIN indexes.
+    ts_query = func.plainto_tsquery('simple', q)
+    search_filter = or_(
+        Page.search_vector.op('@@')(ts_query),
+        Page.title.icontains(q, autoescape=True)
+    )
+    # Highlighted title and content snippet are produced by Postgres in the same query
+    title_highlight = func.ts_headline('simple', Page.title, ts_query, HEADLINE_TITLE_OPTIONS)
+    content_highlight = func.ts_headline('simple', func.coalesce(Page.content, ''), ts_query, HEADLINE_CONTENT_OPTIONS)
     
-    search_term = f"%{q}%"
+    # Project only the columns the response needs; full content never leaves the database
+    query = db.query(
+        Page.id,
+        Page.title,
+        Page.slug,
+        Page.is_public,
+        Page.author_id,
+        Page.created_at,
+        Page.updated_at,
+        User.username.label("author_username"),
+        title_highlight.label("title_highlight"),
+        content_highlight.label("content_highlight")
+    ).outerjoin(User, User.id == Page.author_id).filter(search_filter).order_by(
+        # Best matches first (title hits outrank content hits), newest on ties
+        func.ts_rank_cd(Page.search_vector, ts_query).desc(),
+        Page.updated_at.desc()
+    )
     
     if current_user is None:
-        # Guest: only search public pages
-        pages = db.query(Page).filter(
-            Page.is_public == True,
-            or_(
-                Page.title.ilike(search_term),
-                Page.content.ilike(search_term)
-            )
-        ).limit(50).all()
+        # Guest: only search public pages. Results are the same for every guest,
+        # so short queries are cached until page content changes
+        def fetch_guest_results() -> bytes:
+            # Right after a write cleared the cache, read from the primary so a
+            # lagging replica can't pin pre-write results for a whole TTL
+            if cache.search_results.cleared_within(settings.CACHE_TTL_SECONDS):
+                source = query
+            else:
+                source = query.with_session(read_db)
+            return dumps(format_search_results(
+                source.filter(Page.is_public == True).limit(50).all()
+            ))
+
+        if len(q) > settings.SEARCH_CACHE_MAX_QUERY_LENGTH:
+            return raw_json_response(fetch_guest_results())
+        return raw_json_response(cache.search_results.get_cached(q, fetch_guest_results))
     elif current_user.role == "admin":
         # Admin: search all pages
-        pages = db.query(Page).filter(
-            or_(
-                Page.title.ilike(search_term),
-                Page.content.ilike(search_term)
-            )
-        ).limit(50).all()
+        rows = query.limit(50).all()
     else:
         # User: search accessible pages
         try:
-            collaborator_page_ids_query = db.query(PageCollaborator.page_id).filter(
-                PageCollaborator.user_id == current_user.id
-            )
-            collaborator_page_ids = [row[0] for row in collaborator_page_ids_query.all()]
-            
-            # Build filter conditions
-            access_filter = or_(
-                Page.is_public == True,
-                Page.author_id == current_user.id
-            )
-            
-            # Add collaborator filter if user has any collaborations
-            if collaborator_page_ids:
-                access_filter = or_(
-                    access_filter,
-                    Page.id.in_(collaborator_page_ids)
+            # Collaborator rows are unique per (page, user), so the outer join
+            # adds at most one row per page and needs no DISTINCT
+            rows = query.outerjoin(
+                PageCollaborator,
+                and_(
+                    PageCollaborator.page_id == Page.id,
+                    PageCollaborator.user_id == current_user.id
                 )
-            
-            # Use joinedload to eagerly load author relationship
-            from sqlalchemy.orm import joinedload
-            pages = db.query(Page).options(joinedload(Page.author)).filter(
-                access_filter,
+            ).filter(
                 or_(
-                    Page.title.ilike(search_term),
-                    Page.content.ilike(search_term)
+                    Page.author_id == current_user.id,
+                    Page.is_public == True,
+                    PageCollaborator.id.isnot(None)
                 )
             ).limit(50).all()
-        except Exception as e:
-            logging.error(f"Error searching pages for user {current_user.id}: {e}", exc_info=True)
+        except Exception:
+            logger.exception("Error searching pages for user %s", current_user.id)
             # Fallback to empty list on error
-            pages = []
+            rows = []
     
-    import logging
-    logging.info(f"Found {len(pages)} pages for search query: {q}")
+    logger.debug("Found %d pages for search query %r", len(rows), q)
+
+    return format_search_results(rows)
+
 
-    # Format results with highlights
-    results = []
-    try:
-        for page in pages:
-            try:
-                # Simple highlight: find first occurrence
-                title_highlight = page.title
-                content_highlight = page.content[:200] + "..." if page.content and len(page.content) > 200 else (page.content or "")
-                
-                # Try to highlight search term (simple approach)
-                if q.lower() in page.title.lower():
-                    idx = page.title.lower().find(q.lower())
-                    if idx >= 0:
-                        title_highlight = (
-                            page.title[:idx] +
-                            f"<mark>{page.title[idx:idx+len(q)]}</mark>" +
-                            page.title[idx+len(q):]
-                        )
-                
-                # Ensure author is loaded
-                author_id = page.author_id
-                author_username = "Unknown"
-                if hasattr(page, 'author') and page.author:
-                    author_id = page.author.id
-                    author_username = page.author.username
-                else:
-                    # Fallback: query author if not loaded
-                    from app.models.user import User
-                    author = db.query(User).filter(User.id == page.author_id).first()
-                    if author:
-                        author_id = author.id
-                        author_username = author.username
-                
-                results.append({
-                    "page": {
-                        "id": page.id,
-                        "title": page.title,
-                        "slug": page.slug,
-                        "content": page.content,
-                        "author": {
-                            "id": author_id,
-                            "username": author_username
-                        },
-                        "is_public": page.is_public,
-                        "created_at": page.created_at.isoformat(),
-                        "updated_at": page.updated_at.isoformat()
-                    },
-                    "highlight": {
-                        "title": title_highlight,
-                        "content": content_highlight
-                    }
-                })
-            except Exception as e:
-                logging.error(f"Error formatting page {page.id if page else 'unknown'}: {e}", exc_info=True)
-                continue
-        
-        return results
-    except Exception as e:
-        logging.error(f"Error formatting search results: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Error formatting search results: {str(e)}")
\ No newline at end of file
+def format_search_results(rows) -> List[dict]:
+    """Build the search response from projected result rows"""
+    return [
+        {
+            "page": {
+                "id": row.id,
+                "title": row.title,
+                "slug": row.slug,
+                "author": {
+                    "id": row.author_id,
+                    "username": row.author_username or "Unknown"
+                },
+                "is_public": row.is_public,
+                "created_at": row.created_at,
+                "updated_at": row.updated_at
+            },
+            "highlight": {
+                "title": row.title_highlight,
+                "content": row.content_highlight
+            }
+        }
+        for row in rows
+    ]
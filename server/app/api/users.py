@@ -1,40 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models.user import User
 from app.schemas.user import UserCreate
-from app.core import security
-from fastapi.security import OAuth2PasswordBearer
+from app.core import cache
+from app.core.security import CurrentUser, get_current_user
 
 router = APIRouter()
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
-
-
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-
-    try:
-        payload = security.decode_access_token(token)
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-    except Exception:
-        raise credentials_exception
-
-    user = db.query(User).filter(User.username == username).first()
-    if user is None:
-        raise credentials_exception
-
-    return user
-
 
 @router.get("/me")
-def read_current_user(current_user: User = Depends(get_current_user)):
+def read_current_user(current_user: CurrentUser = Depends(get_current_user)):
     return {
         "id": current_user.id,
         "username": current_user.username,
@@ -44,18 +20,31 @@ def read_current_user(current_user: User = Depends(get_current_user)):
 
 
 @router.get("/admin/users")
-def get_all_users(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def get_all_users(current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    users = db.query(User).all()
-    return users
+    # Project the listed columns only; password hashes never leave the database
+    users = db.query(
+        User.id, User.username, User.email, User.role, User.is_active, User.created_at
+    ).all()
+    return [
+        {
+            "id": user.id,
+            "username": user.username,
+            "email": user.email,
+            "role": user.role,
+            "is_active": user.is_active,
+            "created_at": user.created_at
+        }
+        for user in users
+    ]
 
 
 @router.get("/list")
-def get_users_list(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def get_users_list(current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
     """Get list of users for adding collaborators (returns basic info only)"""
-    users = db.query(User).filter(User.is_active == True).all()
+    users = db.query(User.id, User.username, User.email).filter(User.is_active == True).all()
     return [
         {
             "id": user.id,
@@ -67,7 +56,7 @@ def get_users_list(current_user: User = Depends(get_current_user), db: Session =
 
 
 @router.put("/admin/users/{user_id}/block")
-def block_user(user_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def block_user(user_id: int, current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not authorized")
 
@@ -77,12 +66,15 @@ def block_user(user_id: int, current_user: User = Depends(get_current_user), db:
 
     user.is_active = False
     db.commit()
+    # Drop this worker's cached auth snapshots; other workers pick up the change
+    # when their snapshots expire (AUTH_CACHE_TTL_SECONDS)
+    cache.invalidate("auth:")
 
     return {"message": "User blocked"}
 
 
 @router.put("/admin/users/{user_id}/unblock")
-def unblock_user(user_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def unblock_user(user_id: int, current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not authorized")
 
@@ -92,5 +84,8 @@ def unblock_user(user_id: int, current_user: User = Depends(get_current_user), d
 
     user.is_active = True
     db.commit()
+    # Drop this worker's cached auth snapshots; other workers pick up the change
+    # when their snapshots expire (AUTH_CACHE_TTL_SECONDS)
+    cache.invalidate("auth:")
 
     return {"message": "User unblocked"}
\ No newline at end of file
@@ -0,0 +1,136 @@
+import threading
+import time
+from collections import OrderedDict
+from itertools import islice
+from typing import Any, Callable, Dict, Tuple
+
+from app.core.config import settings
+
+# In-process cache for semi-static, read-heavy responses (e.g. page trees).
+# Entries expire after a TTL and are dropped by prefix when the underlying
+# data changes. Each worker process keeps its own cache, so other workers may
+# serve a stale entry until its TTL runs out.
+MAX_ENTRIES = 10000
+# When full, evict down to this size so pruning isn't repeated on every insert
+PRUNE_TO_ENTRIES = MAX_ENTRIES * 9 // 10
+
+_entries: Dict[str, Tuple[float, Any]] = {}
+_lock = threading.Lock()
+_generation = 0
+_last_invalidation = float("-inf")
+
+
+def get(key: str) -> Any:
+    """Return cached value for key, or None if missing or expired"""
+    with _lock:
+        entry = _entries.get(key)
+    if entry is not None and entry[0] > time.monotonic():
+        return entry[1]
+    return None
+
+
+def put(key: str, value: Any, ttl: float = settings.CACHE_TTL_SECONDS) -> None:
+    """Store value for key for ttl seconds"""
+    now = time.monotonic()
+    with _lock:
+        if len(_entries) >= MAX_ENTRIES:
+            _prune(now)
+        _entries[key] = (now + ttl, value)
+
+
+def get_cached(key: str, fetcher: Callable[[], Any], ttl: int = settings.CACHE_TTL_SECONDS) -> Any:
+    """Return cached value for key, calling fetcher to fill the cache on a miss"""
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(key)
+        generation = _generation
+    if entry is not None and entry[0] > now:
+        return entry[1]
+
+    value = fetcher()
+
+    with _lock:
+        # Don't store a value computed before a concurrent invalidation
+        if generation == _generation:
+            if len(_entries) >= MAX_ENTRIES:
+                _prune(now)
+            _entries[key] = (now + ttl, value)
+    return value
+
+
+def invalidate(prefix: str = "") -> None:
+    """Drop all cached entries whose key starts with prefix"""
+    global _generation, _last_invalidation
+    with _lock:
+        _generation += 1
+        _last_invalidation = time.monotonic()
+        for key in [k for k in _entries if k.startswith(prefix)]:
+            del _entries[key]
+
+
+def invalidated_within(seconds: float) -> bool:
+    """Whether any entries were invalidated in the last seconds"""
+    return time.monotonic() - _last_invalidation < seconds
+
+
+def _prune(now: float) -> None:
+    for key in [k for k, (expires, _) in _entries.items() if expires <= now]:
+        del _entries[key]
+    # Still full: evict the oldest entries instead of flushing everything,
+    # which would also drop every cached login
+    if len(_entries) >= MAX_ENTRIES:
+        for key in list(islice(_entries, len(_entries) - PRUNE_TO_ENTRIES)):
+            del _entries[key]
+
+
+class LRUCache:
+    """Bounded TTL cache that evicts its least recently used entries.
+
+    For keys derived from client input (e.g. guest search queries): a flood of
+    distinct keys only pushes out older entries of the same cache, never the
+    shared entries above.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._last_cleared = float("-inf")
+
+    def get_cached(self, key: str, fetcher: Callable[[], Any]) -> Any:
+        """Return cached value for key, calling fetcher to fill the cache on a miss"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                return entry[1]
+            generation = self._generation
+
+        value = fetcher()
+
+        with self._lock:
+            # Don't store a value computed before a concurrent clear()
+            if generation == self._generation:
+                self._entries[key] = (now + self.ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        """Drop all entries"""
+        with self._lock:
+            self._generation += 1
+            self._last_cleared = time.monotonic()
+            self._entries.clear()
+
+    def cleared_within(self, seconds: float) -> bool:
+        """Whether the cache was cleared in the last seconds"""
+        return time.monotonic() - self._last_cleared < seconds
+
+
+# Guest search results, keyed by normalized query
+search_results = LRUCache(settings.SEARCH_CACHE_MAX_ENTRIES, settings.CACHE_TTL_SECONDS)
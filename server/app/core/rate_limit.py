@@ -0,0 +1,44 @@
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict
+
+
+class RateLimiter:
+    """In-process sliding-window rate limiter.
+
+    Allows at most max_attempts hits per key within window_seconds. State is
+    kept per worker process, so the effective limit scales with the number of
+    workers.
+    """
+
+    # Sweep keys with no recent hits every this many calls to bound memory
+    SWEEP_INTERVAL = 1000
+
+    def __init__(self, max_attempts: int, window_seconds: int):
+        self.max_attempts = max_attempts
+        self.window_seconds = window_seconds
+        self._hits: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+        self._calls = 0
+
+    def hit(self, key: str) -> bool:
+        """Record an attempt for key; return False if the limit is exceeded"""
+        now = time.monotonic()
+        cutoff = now - self.window_seconds
+        with self._lock:
+            self._calls += 1
+            if self._calls % self.SWEEP_INTERVAL == 0:
+                self._sweep(cutoff)
+
+            hits = self._hits.setdefault(key, deque())
+            while hits and hits[0] <= cutoff:
+                hits.popleft()
+            if len(hits) >= self.max_attempts:
+                return False
+            hits.append(now)
+            return True
+
+    def _sweep(self, cutoff: float) -> None:
+        for key in [k for k, hits in self._hits.items() if not hits or hits[-1] <= cutoff]:
+            del self._hits[key]
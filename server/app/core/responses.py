@@ -0,0 +1,25 @@
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse, Response
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize content to JSON bytes the same way ORJSONResponse does"""
+    return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson.
+
+    orjson serializes nested dicts (page trees) and datetimes natively and is
+    several times faster than the stdlib json module used by JSONResponse.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def raw_json_response(body: bytes) -> Response:
+    """Response for a body that is already serialized JSON (e.g. from a cache)"""
+    return Response(content=body, media_type="application/json")
@@ -1,5 +1,8 @@
+import logging
+import time
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends, Security
@@ -8,21 +11,38 @@ from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models.user import User
 from app.core.config import settings
+from app.core import cache
 
-# Password hashing
-pwd_context = CryptContext(schemes=["sha256_crypt"], deprecated="auto")
+# Password hashing: new hashes use argon2id; existing sha256_crypt hashes
+# still verify and are upgraded on the next successful login
+pwd_context = CryptContext(
+    schemes=["argon2", "sha256_crypt"],
+    deprecated="auto",
+    argon2__type="ID",
+    argon2__time_cost=2,
+    argon2__memory_cost=64 * 1024,
+    argon2__parallelism=1,
+)
+
+logger = logging.getLogger(__name__)
 
 # JWT settings - use from config
 SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = settings.ALGORITHM
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
+_ALGORITHMS = [ALGORITHM]
+_DECODE_OPTIONS = {"verify_aud": False, "require_exp": True, "require_sub": True}
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login", auto_error=False)
 http_bearer = HTTPBearer(auto_error=False)
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify password and return a new hash if the stored one uses outdated settings"""
+    # Empty input can never match; skip the KDF
+    if not plain_password or not hashed_password:
+        return False, None
+    return pwd_context.verify_and_update(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
@@ -41,70 +61,97 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
 
 
 def decode_access_token(token: str):
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    """Decode and validate a JWT; return its payload, or None if it is invalid.
+
+    Tokens without exp or sub are rejected here, so callers can rely on both.
+    Valid payloads are cached by token (never past the token's exp), so a
+    token presented again skips signature verification.
+    """
+    cache_key = f"jwt:{token}"
+    payload = cache.get(cache_key)
+    if payload is not None:
         return payload
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=_ALGORITHMS, options=_DECODE_OPTIONS)
     except JWTError as e:
-        # Log the error for debugging
-        import logging
-        logging.warning(f"JWT decode error: {e}")
+        logger.info("JWT decode error: %s", e)
         return None
-    except Exception as e:
-        import logging
-        logging.error(f"Unexpected error decoding token: {e}")
+    ttl = min(settings.JWT_CACHE_TTL_SECONDS, payload["exp"] - time.time())
+    if ttl > 0:
+        cache.put(cache_key, payload, ttl)
+    return payload
+
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """Snapshot of an authenticated user that can be cached across requests"""
+    id: int
+    username: str
+    email: str
+    role: str
+    is_active: bool
+
+
+def resolve_user(token: str, db: Session) -> Optional[CurrentUser]:
+    """Return the active user a valid token was issued for, or None.
+
+    Resolved users are cached by token (never longer than the token lives), so
+    repeated requests with the same token skip JWT decoding and the users query.
+    Blocking a user drops this worker's cached snapshots; other workers may
+    keep accepting the token for up to AUTH_CACHE_TTL_SECONDS.
+    """
+    cache_key = f"auth:{token}"
+    current_user = cache.get(cache_key)
+    if current_user is not None:
+        return current_user
+
+    payload = decode_access_token(token)
+    if payload is None:
+        logger.debug("Failed to decode access token - token may be expired or invalid")
         return None
-
-
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
+    username: str = payload["sub"]
+    user = db.query(User).filter(User.username == username).first()
+    if user is None:
+        logger.warning("User %s not found in database", username)
+        return None
+    if not user.is_active:
+        logger.info("Rejected token of blocked user %s", username)
+        return None
+    current_user = CurrentUser(
+        id=user.id,
+        username=user.username,
+        email=user.email,
+        role=user.role,
+        is_active=user.is_active
     )
+    ttl = min(settings.AUTH_CACHE_TTL_SECONDS, payload["exp"] - time.time())
+    if ttl > 0:
+        cache.put(cache_key, current_user, ttl)
+    return current_user
 
-    try:
-        payload = decode_access_token(token)
-        if payload is None:
-            raise credentials_exception
-
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
 
-    user = db.query(User).filter(User.username == username).first()
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> CurrentUser:
+    """Get the authenticated user, or fail with 401"""
+    user = resolve_user(token, db) if token else None
     if user is None:
-        raise credentials_exception
-
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     return user
 
 
 def get_current_user_optional(
     credentials: Optional[HTTPAuthorizationCredentials] = Security(http_bearer),
     db: Session = Depends(get_db)
-):
-    """Get current user if authenticated, otherwise return None for guest access"""
-    if not credentials:
+) -> Optional[CurrentUser]:
+    """Get current user if authenticated, otherwise return None for guest access."""
+    if not credentials or not credentials.credentials:
         return None
     try:
-        token = credentials.credentials
-        if not token:
-            return None
-        payload = decode_access_token(token)
-        if payload is None:
-            # Token is invalid - log but don't fail
-            logging.warning("Failed to decode access token - token may be expired or invalid")
-            return None
-        username: str = payload.get("sub")
-        if username is None:
-            return None
-        user = db.query(User).filter(User.username == username).first()
-        if user is None:
-            logging.warning(f"User {username} not found in database")
-            return None
-        return user
-    except Exception as e:
+        return resolve_user(credentials.credentials, db)
+    except Exception:
         # Log error for debugging but don't fail - allow guest access
-        logging.error(f"Error getting current user: {e}", exc_info=True)
-        return None
\ No newline at end of file
+        logger.exception("Error getting current user")
+        return None
@@ -4,9 +4,27 @@ from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
 
 # Database configuration from .env file
-engine = create_engine(settings.DATABASE_URL)
+# Sync endpoints run in FastAPI's threadpool, so the pool must be large enough
+# for concurrent requests not to queue on connections. Connections are recycled
+# periodically so idle timeouts on the server or a proxy (e.g. PgBouncer) never
+# hand out a dead connection
+def _create_engine(url: str):
+    return create_engine(
+        url,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=True
+    )
+
+engine = _create_engine(settings.DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Read-only paths that tolerate replication lag (anonymous listings and search)
+# may use a replica; without one they share the primary engine
+read_engine = _create_engine(settings.DATABASE_READ_URL) if settings.DATABASE_READ_URL else engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
 Base = declarative_base()
 
 def get_db():
@@ -14,4 +32,15 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+# Bulk loads (imports, backfills) should not db.add() one ORM object per row:
+# pass lists of column dicts to db.execute(insert(Model), rows) in chunks of
+# ~1000 rows, committing after each chunk, so the driver batches the INSERTs.
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -13,5 +13,13 @@ class PageCollaborator(Base):
     created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
 
     # Relationships
-    page = relationship("Page", back_populates="collaborators")
-    user = relationship("User")
\ No newline at end of file
+    page = relationship("Page", back_populates="collaborators", lazy="raise")
+    user = relationship("User")
+
+    # Unique constraint: one collaborator entry per user per page
+    # (also serves lookups by page); the second index serves lookups by user,
+    # including the access_level filter of write checks
+    __table_args__ = (
+        UniqueConstraint('page_id', 'user_id', name='unique_page_user_collaborator'),
+        Index('ix_page_collaborators_user_page_access', 'user_id', 'page_id', 'access_level'),
+    )
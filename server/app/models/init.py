@@ -3,5 +3,6 @@ from .user import User
 from .page import Page
 from .page_version import PageVersion
 from .collaborator import PageCollaborator
+from .page_closure import PageClosure
 
-__all__ = ["Base", "User", "Page", "PageVersion", "PageCollaborator"]
\ No newline at end of file
+__all__ = ["Base", "User", "Page", "PageVersion", "PageCollaborator", "PageClosure"]
\ No newline at end of file
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, Computed, Index, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import backref, relationship, deferred
 from app.database import Base
 
 class Page(Base):
@@ -13,17 +14,41 @@ class Page(Base):
     slug = Column(String(300), nullable=False)
     content = Column(Text)
     is_public = Column(Boolean, nullable=False, default=False)
+    # Denormalized count of page_likes rows, maintained by triggers on page_likes
+    like_count = Column(Integer, nullable=False, default=0)
     created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
     updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
+    # Full-text search document (title weighted above content), generated by
+    # the database; deferred so page loads don't fetch it
+    search_vector = deferred(Column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(content, '')), 'B')",
+            persisted=True
+        )
+    ))
+
+    __table_args__ = (
+        Index('pages_search_gin', 'search_vector', postgresql_using='gin'),
+        # Trigram index (pg_trgm) so title ILIKE '%q%' substring matches use an index
+        Index('pages_title_trgm', 'title', postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'}),
+        Index('ix_pages_parent_id', 'parent_id'),
+        Index('ix_pages_author_id', 'author_id'),
+        Index('ix_pages_public', 'id', postgresql_where=text('is_public')),
+        Index('ix_pages_slug', 'slug', unique=True, postgresql_ops={'slug': 'varchar_pattern_ops'}),
+    )
 
     # Relationships
     author = relationship("User")
     parent = relationship("Page", remote_side=[id], backref="children")
-    collaborators = relationship("PageCollaborator", back_populates="page")
-    versions = relationship("PageVersion", back_populates="page")
-    likes = relationship("PageLike", backref="page")
+    # Collections raise on lazy access so a loop over pages can't silently
+    # issue one query per page; load them explicitly (e.g. selectinload)
+    collaborators = relationship("PageCollaborator", back_populates="page", lazy="raise")
+    versions = relationship("PageVersion", back_populates="page", lazy="raise")
+    likes = relationship("PageLike", backref=backref("page", lazy="raise"), lazy="raise")
 
-    def to_dict(self, include_like_count=False, db=None, user_id=None):
+    def to_dict(self, include_like_count=False, user_liked=None):
         result = {
             "id": self.id,
             "title": self.title,
@@ -36,20 +61,14 @@ class Page(Base):
                 "id": self.author.id,
                 "username": self.author.username
             },
-            "created_at": self.created_at.isoformat(),
-            "updated_at": self.updated_at.isoformat()
+            "created_at": self.created_at,
+            "updated_at": self.updated_at
         }
         
-        if include_like_count and db:
-            from app.models.page_like import PageLike
-            like_count = db.query(PageLike).filter(PageLike.page_id == self.id).count()
-            result["like_count"] = like_count
-            
-            if user_id:
-                user_liked = db.query(PageLike).filter(
-                    PageLike.page_id == self.id,
-                    PageLike.user_id == user_id
-                ).first() is not None
+        # user_liked is computed by the caller (None for guests)
+        if include_like_count:
+            result["like_count"] = self.like_count
+            if user_liked is not None:
                 result["user_liked"] = user_liked
         
         return result
\ No newline at end of file
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, ForeignKey, Index
+from app.database import Base
+
+class PageClosure(Base):
+    """Transitive closure of the page hierarchy.
+
+    One row per (ancestor, descendant) pair, including each page paired with
+    itself at depth 0. Rows are maintained by database triggers on pages (see
+    migration 007), so the application never writes to this table.
+    """
+    __tablename__ = "page_closure"
+
+    ancestor_id = Column(Integer, ForeignKey("pages.id", ondelete="CASCADE"), primary_key=True)
+    descendant_id = Column(Integer, ForeignKey("pages.id", ondelete="CASCADE"), primary_key=True)
+    depth = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index('ix_page_closure_descendant', 'descendant_id'),
+    )
@@ -15,5 +15,5 @@ class PageVersion(Base):
     created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
 
     # Relationships
-    page = relationship("Page", back_populates="versions")
+    page = relationship("Page", back_populates="versions", lazy="raise")
     author = relationship("User")
\ No newline at end of file
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from typing import Optional
+from datetime import datetime
 
 class CollaboratorCreate(BaseModel):
     user_id: int
@@ -9,5 +10,5 @@ class CollaboratorResponse(BaseModel):
     id: int
     user: dict
     access_level: str
-    created_at: str
+    created_at: datetime
 
@@ -25,7 +25,7 @@ class Page(PageBase):
     updated_at: datetime
     author: dict
 
-    model_config = ConfigDict(from_attributes=True)
+    model_config = ConfigDict(from_attributes=True, defer_build=True)
 
 class PageTreeItem(Page):
     children: List['PageTreeItem'] = []
@@ -40,7 +40,7 @@ class PageVersion(BaseModel):
     created_at: datetime
     author: dict
 
-    model_config = ConfigDict(from_attributes=True)
+    model_config = ConfigDict(from_attributes=True, defer_build=True)
 
-# Update forward reference
-PageTreeItem.update_forward_refs()
\ No newline at end of file
+# Resolve the forward reference
+PageTreeItem.model_rebuild()
\ No newline at end of file
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, ConfigDict
 from typing import Optional
+from datetime import datetime
 
 class UserBase(BaseModel):
     username: str
@@ -20,6 +21,6 @@ class User(UserBase):
     email: str
     role: str
     is_active: bool
-    created_at: str
+    created_at: datetime
 
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True, defer_build=True)
\ No newline at end of file